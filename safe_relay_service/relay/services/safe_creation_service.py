@@ -1,16 +1,27 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Tuple
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
+import requests
+from cachetools import TTLCache, cached
+from eth_abi.exceptions import InsufficientDataBytes
 from eth_account import Account
 from hexbytes import HexBytes
 from redis import Redis
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from web3.exceptions import BadFunctionCallOutput
 
 from gnosis.eth import EthereumClient, EthereumClientProvider
 from gnosis.eth.constants import NULL_ADDRESS
 from gnosis.safe import ProxyFactory, Safe
-from gnosis.safe.exceptions import CannotRetrieveSafeInfoException
 from gnosis.safe.safe import SafeCreationEstimate, SafeInfo
 
 from safe_relay_service.gas_station.gas_station import (GasStation,
@@ -24,6 +35,29 @@ from ..repositories.redis_repository import EthereumNonceLock, RedisRepository
 logger = getLogger(__name__)
 
 
+token_eth_value_cache = TTLCache(maxsize=128, ttl=30)
+token_eth_value_cache_lock = threading.Lock()  # cachetools caches are not thread-safe
+
+
+@cached(cache=token_eth_value_cache, lock=token_eth_value_cache_lock)
+def get_token_eth_value(address: str) -> Optional[float]:
+    """
+    :param address: Token address
+    :return: Current eth value of the token, `None` if it's not a valid gas token
+    :raises: CannotGetTokenPriceFromApi
+    """
+    try:
+        return Token.objects.get(address=address, gas=True).get_eth_value()
+    except Token.DoesNotExist:
+        return None
+
+
+@receiver([post_save, post_delete], sender=Token)
+def clear_token_eth_value_cache(sender, instance, **kwargs):
+    with token_eth_value_cache_lock:
+        token_eth_value_cache.clear()
+
+
 class SafeCreationServiceException(Exception):
     pass
 
@@ -49,16 +83,21 @@ class SafeAlreadyExistsException(SafeCreationServiceException):
 
 
 class SafeCreationServiceProvider:
+    _lock = threading.Lock()
+
     def __new__(cls):
         if not hasattr(cls, 'instance'):
-            cls.instance = SafeCreationService(GasStationProvider(),
-                                               EthereumClientProvider(),
-                                               RedisRepository().redis,
-                                               settings.SAFE_CONTRACT_ADDRESS,
-                                               settings.SAFE_PROXY_FACTORY_ADDRESS,
-                                               settings.SAFE_DEFAULT_CALLBACK_HANDLER,
-                                               settings.SAFE_FUNDER_PRIVATE_KEY,
-                                               settings.SAFE_FIXED_CREATION_COST)
+            # Double-checked lock, so concurrent first calls don't build the heavyweight service twice
+            with cls._lock:
+                if not hasattr(cls, 'instance'):
+                    cls.instance = SafeCreationService(GasStationProvider(),
+                                                       EthereumClientProvider(),
+                                                       RedisRepository().redis,
+                                                       settings.SAFE_CONTRACT_ADDRESS,
+                                                       settings.SAFE_PROXY_FACTORY_ADDRESS,
+                                                       settings.SAFE_DEFAULT_CALLBACK_HANDLER,
+                                                       settings.SAFE_FUNDER_PRIVATE_KEY,
+                                                       settings.SAFE_FIXED_CREATION_COST)
         return cls.instance
 
     @classmethod
@@ -68,16 +107,20 @@ class SafeCreationServiceProvider:
 
 
 class SafeCreationV1_0_0ServiceProvider:
+    _lock = threading.Lock()
+
     def __new__(cls):
         if not hasattr(cls, 'instance'):
-            cls.instance = SafeCreationService(GasStationProvider(),
-                                               EthereumClientProvider(),
-                                               RedisRepository().redis,
-                                               settings.SAFE_V1_0_0_CONTRACT_ADDRESS,
-                                               settings.SAFE_PROXY_FACTORY_V1_0_0_ADDRESS,
-                                               settings.SAFE_DEFAULT_CALLBACK_HANDLER,
-                                               settings.SAFE_FUNDER_PRIVATE_KEY,
-                                               settings.SAFE_FIXED_CREATION_COST)
+            with cls._lock:
+                if not hasattr(cls, 'instance'):
+                    cls.instance = SafeCreationService(GasStationProvider(),
+                                                       EthereumClientProvider(),
+                                                       RedisRepository().redis,
+                                                       settings.SAFE_V1_0_0_CONTRACT_ADDRESS,
+                                                       settings.SAFE_PROXY_FACTORY_V1_0_0_ADDRESS,
+                                                       settings.SAFE_DEFAULT_CALLBACK_HANDLER,
+                                                       settings.SAFE_FUNDER_PRIVATE_KEY,
+                                                       settings.SAFE_FIXED_CREATION_COST)
         return cls.instance
 
     @classmethod
@@ -98,27 +141,36 @@ class SafeCreationService:
         self.default_callback_handler = default_callback_handler
         self.funder_account = Account.from_key(safe_funder_private_key)
         self.safe_fixed_creation_cost = safe_fixed_creation_cost
+        # Shared pool for issuing independent RPC calls concurrently, created once to avoid
+        # spawning threads on every request
+        self._io_pool = ThreadPoolExecutor(max_workers=8)
+
+    @staticmethod
+    def _normalize_payment_token(address: Optional[str]) -> Tuple[str, bool]:
+        """
+        :param address: Payment token address, empty or `None` for ether
+        :return: Tuple of canonical token address and whether it is ether
+        """
+        address = address or NULL_ADDRESS
+        return address, address == NULL_ADDRESS
 
     def _get_token_eth_value_or_raise(self, address: str) -> float:
         """
-        :param address: Token address
+        :param address: Token address (normalized, not ether)
         :return: Current eth value of the token
         :raises: InvalidPaymentToken, CannotGetTokenPriceFromApi
         """
-        address = address or NULL_ADDRESS
-        if address == NULL_ADDRESS:
-            return 1.0
-
-        try:
-            token = Token.objects.get(address=address, gas=True)
-            return token.get_eth_value()
-        except Token.DoesNotExist:
+        eth_value = get_token_eth_value(address)
+        if eth_value is None:
             logger.warning('Cannot get value of token in eth: Gas token %s not valid', address)
             raise InvalidPaymentToken(address)
+        return eth_value
 
+    @cached(cache=TTLCache(maxsize=8, ttl=5), lock=threading.Lock())
     def _get_configured_gas_price(self) -> int:
         """
-        :return: Gas price for txs
+        :return: Gas price for txs. Cached for a few seconds so bursts of safe creations don't
+        query the gas station every time
         """
         return self.gas_station.get_gas_prices().fast
 
@@ -134,8 +186,8 @@ class SafeCreationService:
         :raises: InvalidPaymentToken
         """
 
-        payment_token = payment_token or NULL_ADDRESS
-        payment_token_eth_value = self._get_token_eth_value_or_raise(payment_token)
+        payment_token, payment_token_is_ether = self._normalize_payment_token(payment_token)
+        payment_token_eth_value = 1.0 if payment_token_is_ether else self._get_token_eth_value_or_raise(payment_token)
         gas_price: int = self._get_configured_gas_price()
         current_block_number = self.ethereum_client.current_block_number
         logger.debug('Building safe create2 tx with gas price %d', gas_price)
@@ -146,37 +198,39 @@ class SafeCreationService:
                                                       payment_token_eth_value=payment_token_eth_value,
                                                       fixed_creation_cost=self.safe_fixed_creation_cost)
 
-        safe_contract, created = SafeContract.objects.get_or_create(
-            address=safe_creation_tx.safe_address,
-            defaults={
-                'master_copy': safe_creation_tx.master_copy_address
-            })
-
-        if not created:
-            raise SafeAlreadyExistsException(f'Safe={safe_contract.address} cannot be created, already exists')
-
-        # Enable tx and erc20 tracing
-        SafeTxStatus.objects.create(safe=safe_contract,
-                                    initial_block_number=current_block_number,
-                                    tx_block_number=current_block_number,
-                                    erc_20_block_number=current_block_number)
-
-        return SafeCreation2.objects.create(
-            safe=safe_contract,
-            master_copy=safe_creation_tx.master_copy_address,
-            proxy_factory=safe_creation_tx.proxy_factory_address,
-            salt_nonce=salt_nonce,
-            owners=owners,
-            threshold=threshold,
-            # to  # Contract address for optional delegate call
-            # data # Data payload for optional delegate call
-            payment_token=None if safe_creation_tx.payment_token == NULL_ADDRESS else safe_creation_tx.payment_token,
-            payment=safe_creation_tx.payment,
-            payment_receiver=safe_creation_tx.payment_receiver,
-            setup_data=safe_creation_tx.safe_setup_data,
-            gas_estimated=safe_creation_tx.gas,
-            gas_price_estimated=safe_creation_tx.gas_price,
-        )
+        with transaction.atomic():  # Commit the inserts together, one fsync instead of three
+            safe_contract, created = SafeContract.objects.get_or_create(
+                address=safe_creation_tx.safe_address,
+                defaults={
+                    'master_copy': safe_creation_tx.master_copy_address
+                })
+
+            if not created:
+                raise SafeAlreadyExistsException(f'Safe={safe_contract.address} cannot be created, already exists')
+
+            # Enable tx and erc20 tracing
+            SafeTxStatus.objects.create(safe=safe_contract,
+                                        initial_block_number=current_block_number,
+                                        tx_block_number=current_block_number,
+                                        erc_20_block_number=current_block_number)
+
+            return SafeCreation2.objects.create(
+                safe=safe_contract,
+                master_copy=safe_creation_tx.master_copy_address,
+                proxy_factory=safe_creation_tx.proxy_factory_address,
+                salt_nonce=salt_nonce,
+                owners=owners,
+                threshold=threshold,
+                # to  # Contract address for optional delegate call
+                # data # Data payload for optional delegate call
+                payment_token=None if safe_creation_tx.payment_token == NULL_ADDRESS
+                else safe_creation_tx.payment_token,
+                payment=safe_creation_tx.payment,
+                payment_receiver=safe_creation_tx.payment_receiver,
+                setup_data=safe_creation_tx.safe_setup_data,
+                gas_estimated=safe_creation_tx.gas,
+                gas_price_estimated=safe_creation_tx.gas_price,
+            )
 
     def deploy_create2_safe_tx(self, safe_address: str) -> SafeCreation2:
         """
@@ -184,7 +238,10 @@ class SafeCreationService:
         :param safe_address:
         :return: tx_hash
         """
-        safe_creation2: SafeCreation2 = SafeCreation2.objects.get(safe=safe_address)
+        safe_creation2: SafeCreation2 = SafeCreation2.objects.select_related('safe').only(
+            'safe__address', 'safe__master_copy', 'master_copy', 'proxy_factory', 'payment_token', 'payment',
+            'setup_data', 'salt_nonce', 'gas_estimated', 'gas_price_estimated', 'tx_hash'
+        ).get(safe=safe_address)
 
         if safe_creation2.tx_hash:
             logger.info('Safe=%s has already been deployed with tx-hash=%s', safe_address, safe_creation2.tx_hash)
@@ -207,7 +264,7 @@ class SafeCreationService:
         logger.info('Found %d balance for safe=%s with payment-token=%s. Required=%d', safe_balance,
                     safe_address, safe_creation2.payment_token, safe_creation2.payment)
 
-        setup_data = HexBytes(safe_creation2.setup_data.tobytes())
+        setup_data = HexBytes(bytes(safe_creation2.setup_data))
 
         with EthereumNonceLock(self.redis, self.ethereum_client, self.funder_account.address,
                                lock_timeout=60 * 2) as tx_nonce:
@@ -221,7 +278,7 @@ class SafeCreationService:
                                                                               nonce=tx_nonce)
             EthereumTx.objects.create_from_tx(ethereum_tx_sent.tx, ethereum_tx_sent.tx_hash)
             safe_creation2.tx_hash = ethereum_tx_sent.tx_hash
-            safe_creation2.save()
+            safe_creation2.save(update_fields=['tx_hash', 'modified'])
             logger.info('Deployed safe=%s with tx-hash=%s', safe_address, ethereum_tx_sent.tx_hash.hex())
             return safe_creation2
 
@@ -232,8 +289,8 @@ class SafeCreationService:
         :return:
         :raises: InvalidPaymentToken
         """
-        payment_token = payment_token or NULL_ADDRESS
-        payment_token_eth_value = self._get_token_eth_value_or_raise(payment_token)
+        payment_token, payment_token_is_ether = self._normalize_payment_token(payment_token)
+        payment_token_eth_value = 1.0 if payment_token_is_ether else self._get_token_eth_value_or_raise(payment_token)
         gas_price = self._get_configured_gas_price()
         fixed_creation_cost = self.safe_fixed_creation_cost
         return Safe.estimate_safe_creation_2(self.ethereum_client,
@@ -268,6 +325,98 @@ class SafeCreationService:
             raise SafeNotDeployed('Safe with address=%s not deployed' % address)
 
         try:
-            return safe.retrieve_all_info()
-        except CannotRetrieveSafeInfoException as e:
+            return self._retrieve_safe_info_batched(safe)
+        except ConnectionError:  # Node does not support JSON-RPC batching
+            try:
+                return self._retrieve_safe_info_threaded(safe)
+            except (ValueError, BadFunctionCallOutput) as e:
+                raise CannotRetrieveSafeInfo(address) from e
+        except (ValueError, BadFunctionCallOutput, InsufficientDataBytes) as e:
             raise CannotRetrieveSafeInfo(address) from e
+
+    def _retrieve_safe_info_threaded(self, safe: Safe) -> SafeInfo:
+        """
+        Fallback for nodes without JSON-RPC batching support. The retrieve calls are independent
+        read-only RPCs, so issue them concurrently instead of waiting for one round trip per call
+        :param safe: Safe to get the information from
+        :return: SafeInfo
+        :raises: ValueError, BadFunctionCallOutput (maybe contract is not a Safe)
+        """
+        futures = [self._io_pool.submit(fn) for fn in (safe.retrieve_master_copy_address,
+                                                       safe.retrieve_fallback_handler,
+                                                       safe.retrieve_modules,
+                                                       safe.retrieve_nonce,
+                                                       safe.retrieve_owners,
+                                                       safe.retrieve_threshold,
+                                                       safe.retrieve_version)]
+        (master_copy, fallback_handler, modules,
+         nonce, owners, threshold, version) = [future.result() for future in futures]
+        return SafeInfo(safe.address, fallback_handler, master_copy, modules, nonce, owners, threshold, version)
+
+    @staticmethod
+    def _address_from_storage_word(value: str) -> str:
+        address = HexBytes(value)[-20:]
+        if len(address) == 20:
+            return Web3.toChecksumAddress(address)
+        else:
+            return NULL_ADDRESS
+
+    def _retrieve_safe_info_batched(self, safe: Safe) -> SafeInfo:
+        """
+        Get all the Safe info using one single JSON-RPC batch request. `Safe.retrieve_all_info` needs
+        3 HTTP round trips (2 `eth_getStorageAt` and 1 `eth_call` batch), this needs just 1
+        :param safe: Safe to get the information from
+        :return: SafeInfo
+        :raises: ConnectionError (node or http error), ValueError (any of the calls failed),
+        InsufficientDataBytes (cannot decode, maybe contract is not a Safe)
+        """
+        address = safe.address
+        contract = safe.get_contract()
+        contract_functions = [contract.functions.nonce(), contract.functions.getThreshold(),
+                              contract.functions.getOwners(), contract.functions.getModules(),
+                              contract.functions.VERSION()]
+        # Storage reads for the master copy (slot 0) and the fallback handler
+        payload = [{'jsonrpc': '2.0',
+                    'method': 'eth_getStorageAt',
+                    'params': [address, storage_slot, 'latest'],
+                    'id': i} for i, storage_slot in enumerate(('0x0', safe.FALLBACK_HANDLER_STORAGE_SLOT))]
+        for i, contract_function in enumerate(contract_functions, start=len(payload)):
+            payload.append({'jsonrpc': '2.0',
+                            'method': 'eth_call',
+                            'params': [{'to': address,
+                                        # Encode the calldata locally, `buildTransaction` would
+                                        # issue an `eth_chainId` RPC for every function
+                                        'data': contract_function._encode_transaction_data()},
+                                       'latest'],
+                            'id': i})
+
+        response = requests.post(self.ethereum_client.ethereum_node_url, json=payload)
+        if not response.ok:
+            raise ConnectionError(f'Error connecting to {self.ethereum_client.ethereum_node_url}: {response.text}')
+        try:
+            response_json = response.json()
+        except ValueError as e:
+            raise ConnectionError(f'Invalid response from {self.ethereum_client.ethereum_node_url}: '
+                                  f'{response.text}') from e
+        if not isinstance(response_json, list):  # Nodes not supporting batching return a plain error object
+            raise ConnectionError(f'Batch requests not supported by {self.ethereum_client.ethereum_node_url}: '
+                                  f'{response.text}')
+
+        results = {result['id']: result for result in response_json}  # Nodes can reorder batch responses
+        errors = [result['error'] for result in results.values() if 'error' in result]
+        if errors:
+            raise ValueError(f'Errors returned for safe={address}: {errors}')
+
+        master_copy = self._address_from_storage_word(results[0]['result'])
+        fallback_handler = self._address_from_storage_word(results[1]['result'])
+        decoded_values = []
+        for i, contract_function in enumerate(contract_functions, start=2):
+            output_types = [output['type'] for output in contract_function.abi['outputs']]
+            decoded = self.ethereum_client.w3.codec.decode_abi(output_types,
+                                                               HexBytes(results[i]['result']))
+            normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+            decoded_values.append(normalized[0] if len(normalized) == 1 else normalized)
+        nonce, threshold, owners, modules, version = decoded_values
+        if len(modules) == 10:  # Pagination is enabled and by default is 10, get the full list
+            modules = safe.retrieve_modules()
+        return SafeInfo(address, fallback_handler, master_copy, modules, nonce, owners, threshold, version)
@@ -1,3 +1,7 @@
+import random
+from functools import lru_cache
+from typing import Tuple
+
 from eth_account import Account
 
 from gnosis.safe.tests.safe_test_case import SafeTestCaseMixin
@@ -11,7 +15,38 @@ from ..services.safe_creation_service import SafeCreationServiceProvider
 from ..services.transaction_service import TransactionServiceProvider
 
 
+@lru_cache(maxsize=None)
+def _owner_address_pool() -> Tuple[str, ...]:
+    """
+    secp256k1 keygen is pure CPU (~1ms per account), so tests using owners just as addresses
+    draw them from a pool generated once per process instead of creating accounts every time
+    """
+    return tuple(Account.create().address for _ in range(128))
+
+
 class RelayTestCaseMixin(SafeTestCaseMixin):
+    deploy_shared_safe = False  # Set to `True` on test cases reusing `shared_safe_creation_tx`
+
+    def setUp(self):
+        super().setUp()
+        if self.deploy_shared_safe and getattr(self.__class__, 'shared_safe_creation_tx', None) is None:
+            # Deployed before the first snapshot, so reverting between tests keeps it alive
+            self.__class__.shared_safe_creation_tx = self.deploy_test_safe()
+            self.__class__.shared_safe_address = self.shared_safe_creation_tx.safe_address
+        # Snapshot the chain, so everything a test deploys or sends is reverted afterwards,
+        # mirroring what Django transactions do for the database
+        self._chain_snapshot_id = self.w3.manager.request_blocking('evm_snapshot', [])
+
+    def tearDown(self):
+        self.w3.manager.request_blocking('evm_revert', [self._chain_snapshot_id])
+        # The revert rolls back the on-chain account nonces, so drop the nonces cached in Redis
+        # by `EthereumNonceLock` or the next nonce-locked send would be rejected by the node
+        redis = self.safe_creation_service.redis
+        nonce_keys = redis.keys('ethereum:nonce:*')
+        if nonce_keys:
+            redis.delete(*nonce_keys)
+        super().tearDown()
+
     @classmethod
     def setUpTestData(cls):
         super().setUpTestData()
@@ -28,7 +63,7 @@ class RelayTestCaseMixin(SafeTestCaseMixin):
                                 payment_token=None, salt_nonce=None) -> SafeCreation2:
 
         salt_nonce = salt_nonce or generate_salt_nonce()
-        owners = owners or [Account.create().address for _ in range(number_owners)]
+        owners = owners or random.sample(_owner_address_pool(), number_owners)
         threshold = threshold if threshold else len(owners)
 
         return self.safe_creation_service.create2_safe_tx(salt_nonce, owners, threshold, payment_token)
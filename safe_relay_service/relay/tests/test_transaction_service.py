@@ -1,7 +1,11 @@
+from functools import lru_cache
+
 from django.test import TestCase
 
+import coincurve
 from eth_account import Account
 from hexbytes import HexBytes
+from web3 import Web3
 
 from gnosis.eth.constants import NULL_ADDRESS
 from gnosis.eth.contracts import get_paying_proxy_contract, get_safe_contract
@@ -22,7 +26,29 @@ from .factories import SafeContractFactory, SafeMultisigTxFactory
 from .relay_test_case import RelayTestCaseMixin
 
 
+def _sign_hash_fast(digest: bytes, private_key: bytes):
+    """
+    Sign a digest calling coincurve directly, skipping the `eth_account` wrapper layers.
+    Returns the `v`, `r`, `s` mapping the transaction service consumes
+    """
+    signature = coincurve.PrivateKey(bytes(private_key)).sign_recoverable(bytes(digest), hasher=None)
+    return {'r': int.from_bytes(signature[:32], 'big'),
+            's': int.from_bytes(signature[32:64], 'big'),
+            'v': signature[64] + 27}
+
+
+@lru_cache(maxsize=None)
+def _safe_contract_factory(w3: Web3):
+    """
+    Processing the Safe ABI is the expensive part of `w3.eth.contract`, so build the contract
+    factory once per provider and let tests just bind the address
+    """
+    return get_safe_contract(w3)
+
+
 class TestTransactionService(RelayTestCaseMixin, TestCase):
+    deploy_shared_safe = True
+
     def test_create_multisig_tx(self):
         w3 = self.w3
 
@@ -40,7 +66,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
 
         safe_creation = self.deploy_test_safe(owners=owners, threshold=threshold)
         my_safe_address = safe_creation.safe_address
-        my_safe_contract = get_safe_contract(w3, my_safe_address)
+        my_safe_contract = _safe_contract_factory(w3)(address=my_safe_address)
         SafeContractFactory(address=my_safe_address)
 
         to = funder
@@ -53,7 +79,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
         gas_token = NULL_ADDRESS
         refund_receiver = NULL_ADDRESS
         safe = Safe(my_safe_address, self.ethereum_client)
-        nonce = safe.retrieve_nonce()
+        nonce = 0  # Safe is freshly deployed, no need to ask the node
         safe_multisig_tx_hash = safe.build_multisig_tx(to,
                                                        value,
                                                        data,
@@ -80,11 +106,11 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
 
         self.assertEqual(safe_multisig_tx_hash, contract_multisig_tx_hash)
 
-        signatures = [account.signHash(safe_multisig_tx_hash) for account in accounts]
+        signatures = [_sign_hash_fast(safe_multisig_tx_hash, account.key) for account in accounts]
 
         # Check owners are the same
         contract_owners = my_safe_contract.functions.getOwners().call()
-        self.assertEqual(set(contract_owners), set(owners))
+        self.assertCountEqual(contract_owners, owners)
 
         invalid_proxy = self.deploy_example_erc20(1, NULL_ADDRESS)
         with self.assertRaises(InvalidProxyContract):
@@ -284,7 +310,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
                                                        refund_receiver,
                                                        safe_nonce=nonce).safe_tx_hash
 
-        signatures = [account.signHash(safe_multisig_tx_hash) for account in accounts]
+        signatures = [_sign_hash_fast(safe_multisig_tx_hash, account.key) for account in accounts]
 
         safe_multisig_tx = self.transaction_service.create_multisig_tx(
             my_safe_address,
@@ -320,7 +346,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
 
         # We need a real safe deployed for this method to work
         gas_token = NULL_ADDRESS
-        safe_address = self.deploy_test_safe().safe_address
+        safe_address = self.shared_safe_address
         transaction_estimation = self.transaction_service.estimate_tx(safe_address, to, value, data, operation,
                                                                       gas_token)
         self.assertEqual(transaction_estimation.last_used_nonce, None)
@@ -332,7 +358,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
         self.assertEqual(transaction_estimation.gas_token, NULL_ADDRESS)
 
     def test_estimate_tx_for_all_tokent(self):
-        safe_address = self.deploy_test_safe().safe_address
+        safe_address = self.shared_safe_address
         to = Account.create().address
         value = 0
         data = b''
@@ -372,7 +398,7 @@ class TestTransactionService(RelayTestCaseMixin, TestCase):
         self.assertEqual(estimation_token.gas_token, valid_token.address)
 
     def test_get_last_nonce(self):
-        safe_address = self.deploy_test_safe().safe_address
+        safe_address = self.shared_safe_address
         safe_contract = SafeContractFactory(address=safe_address)
         self.assertIsNone(self.transaction_service.get_last_used_nonce(safe_address))
         SafeMultisigTxFactory(safe=safe_contract, nonce=12)
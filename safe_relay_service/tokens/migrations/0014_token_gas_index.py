@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0013_auto_20200217_0942'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='token',
+            index=models.Index(condition=models.Q(gas=True), fields=['address'], name='tokens_token_gas_idx'),
+        ),
+    ]
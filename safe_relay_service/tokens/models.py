@@ -63,6 +63,12 @@ class Token(models.Model):
     fixed_eth_conversion = models.DecimalField(null=True, default=None, blank=True, max_digits=25, decimal_places=15)
     relevance = models.PositiveIntegerField(default=100)
 
+    class Meta:
+        indexes = [
+            # Gas token lookups are on the safe creation request path
+            models.Index(fields=['address'], condition=models.Q(gas=True), name='tokens_token_gas_idx'),
+        ]
+
     def __str__(self):
         return '%s - %s' % (self.name, self.address)
 